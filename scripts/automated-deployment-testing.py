@@ -21,1666 +21,121 @@ Requirements:
     - Virtual environment with dependencies from requirements.txt
 """
 
-import argparse
-import json
 import os
 import sys
-import time
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Any
-from datetime import datetime
 
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
-
-@dataclass
-class TestAccount:
-    email: str
-    password: str
-
-
-@dataclass
-class TestResult:
-    test_id: str
-    name: str
-    status: str  # 'PASS', 'FAIL', 'SKIP'
-    message: str
-    duration: float
-
-
-@dataclass
-class TestSession:
-    accounts: Dict[str, TestAccount]
-    tokens: Dict[str, str]
-    base_url: str
-    results: List[TestResult]
-    start_time: float
-
-
-class Colors:
-    RESET = '\033[0m'
-    INFO = '\033[36m'      # Cyan
-    SUCCESS = '\033[32m'   # Green
-    WARN = '\033[33m'      # Yellow
-    ERROR = '\033[31m'     # Red
-
-
-class EkkoTestRunner:
-    def __init__(self, base_url: str = 'http://localhost:3000', is_production: bool = False):
-        self.is_production = is_production
-        self.session = TestSession(
-            accounts={
-                'admin': TestAccount('admin@ekko.earth', 'Password123!'),
-                'london_manager': TestAccount('london.manager@ekko.earth', 'Password123!'),
-                'manchester_manager': TestAccount('manchester.manager@ekko.earth', 'Password123!'),
-                'westminster_staff': TestAccount('westminster.staff@ekko.earth', 'Password123!'),
-                'camden_staff': TestAccount('camden.staff@ekko.earth', 'Password123!'),
-                'citycentre_staff': TestAccount('citycentre.staff@ekko.earth', 'Password123!')
-            },
-            tokens={},
-            base_url=base_url.rstrip('/'),
-            results=[],
-            start_time=time.time()
-        )
-
-        # Configure requests session with retries and proper headers
-        self.http_session = requests.Session()
-
-        # Add retry strategy
-        retry_strategy = Retry(
-            total=3,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["HEAD", "GET", "POST", "OPTIONS"],
-            backoff_factor=1
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.http_session.mount("http://", adapter)
-        self.http_session.mount("https://", adapter)
-
-        # Set default headers
-        self.http_session.headers.update({
-            'User-Agent': 'Ekko-Test-Runner/1.0-Python',
-            'Content-Type': 'application/json'
-        })
-
-        # Add Vercel Protection Bypass only for production environments
-        if self.is_production:
-            bypass_secret = os.getenv('VERCEL_PROTECTION_BYPASS')
-            if bypass_secret:
-                self.http_session.headers.update({
-                    'x-vercel-protection-bypass': bypass_secret
-                })
-                self.log(f"Using bypass secret: {bypass_secret[:8]}...", 'INFO')
-            else:
-                self.log('No bypass secret found in VERCEL_PROTECTION_BYPASS for production', 'WARN')
-
-        # Log environment configuration
-        db_type = "PostgreSQL" if self.is_production else "SQLite"
-        env_type = "Production" if self.is_production else "Local Development"
-        self.log(f"Environment: {env_type} ({db_type})", 'INFO')
-
-    def log(self, message: str, level: str = 'INFO'):
-        """Enhanced logging with colors and timestamps"""
-        timestamp = datetime.now().isoformat()
-        color = getattr(Colors, level, Colors.INFO)
-        print(f"{color}[{timestamp}] [{level}] {message}{Colors.RESET}")
-
-    def make_graphql_request(self, query: str, variables: Optional[Dict] = None, token: Optional[str] = None) -> Dict:
-        """Make a GraphQL request with proper error handling"""
-        headers = {}
-        if token:
-            headers['Authorization'] = f'Bearer {token}'
-
-        payload = {'query': query}
-        if variables:
-            payload['variables'] = variables
-
-        self.log(f"Making GraphQL request to: {self.session.base_url}/api/graphql")
-        self.log(f"Headers: {json.dumps(dict(self.http_session.headers, **headers))}")
-
-        try:
-            response = self.http_session.post(
-                f'{self.session.base_url}/api/graphql',
-                json=payload,
-                headers=headers,
-                timeout=30
-            )
-
-            self.log(f"Response status: {response.status_code}")
-
-            if response.status_code != 200:
-                raise Exception(f"GraphQL request failed: {response.status_code} {response.reason}")
-
-            return response.json()
-
-        except requests.exceptions.RequestException as e:
-            self.log(f"Request error: {str(e)}", 'ERROR')
-            raise Exception(f"Network request failed: {str(e)}")
-        except json.JSONDecodeError as e:
-            self.log(f"JSON decode error: {str(e)}", 'ERROR')
-            self.log(f"Response content: {response.text[:500]}", 'ERROR')
-            raise Exception(f"Invalid JSON response: {str(e)}")
-
-    def authenticate_user(self, account_key: str) -> str:
-        """Authenticate a user and return JWT token"""
-        if account_key in self.session.tokens:
-            return self.session.tokens[account_key]
-
-        account = self.session.accounts[account_key]
-
-        mutation = """
-        mutation Login($input: AuthInput!) {
-            login(input: $input) {
-                token
-                user {
-                    id
-                    email
-                    name
-                }
-                expiresAt
-            }
-        }
-        """
-
-        variables = {
-            'input': {
-                'email': account.email,
-                'password': account.password
-            }
-        }
-
-        response = self.make_graphql_request(mutation, variables)
-
-        if 'errors' in response:
-            raise Exception(f"Authentication failed: {json.dumps(response['errors'])}")
-
-        if not response.get('data', {}).get('login', {}).get('token'):
-            raise Exception("Login failed: No token received")
-
-        token = response['data']['login']['token']
-        self.session.tokens[account_key] = token
-        self.log(f"Successfully authenticated {account.email}", 'SUCCESS')
-        return token
-
-    def run_test(self, test_id: str, name: str, test_function):
-        """Run a single test with error handling and timing"""
-        start_time = time.time()
-        self.log(f"Starting test: {test_id} - {name}")
-
-        try:
-            test_function()
-            duration = time.time() - start_time
-            self.session.results.append(TestResult(
-                test_id=test_id,
-                name=name,
-                status='PASS',
-                message='Test completed successfully',
-                duration=duration
-            ))
-            self.log(f"✅ PASS: {test_id} - {name} ({duration*1000:.0f}ms)", 'SUCCESS')
-        except Exception as e:
-            duration = time.time() - start_time
-            message = str(e)
-            self.session.results.append(TestResult(
-                test_id=test_id,
-                name=name,
-                status='FAIL',
-                message=message,
-                duration=duration
-            ))
-            self.log(f"❌ FAIL: {test_id} - {name} ({duration*1000:.0f}ms): {message}", 'ERROR')
-
-    # Phase 1 Tests
-    def test_authentication(self):
-        """P1T1 - User Authentication"""
-        # Test admin login
-        admin_token = self.authenticate_user('admin')
-        if not admin_token:
-            raise Exception("Failed to authenticate admin user")
-
-        # Test manager login
-        manager_token = self.authenticate_user('london_manager')
-        if not manager_token:
-            raise Exception("Failed to authenticate manager user")
-
-        # Test staff login
-        staff_token = self.authenticate_user('westminster_staff')
-        if not staff_token:
-            raise Exception("Failed to authenticate staff user")
-
-    def test_hierarchical_permissions(self):
-        """P1T2 - Hierarchical Permissions"""
-        admin_token = self.authenticate_user('admin')
-        manager_token = self.authenticate_user('london_manager')
-
-        # Test admin can see all organizations (using correct schema)
-        query = """
-        query GetOrganizationTree {
-            organizationTree {
-                id
-                name
-                level
-                children {
-                    id
-                    name
-                    level
-                }
-            }
-        }
-        """
-
-        admin_response = self.make_graphql_request(query, token=admin_token)
-        if 'errors' in admin_response:
-            raise Exception(f"Admin query failed: {json.dumps(admin_response['errors'])}")
-
-        admin_orgs = admin_response.get('data', {}).get('organizationTree', [])
-        if len(admin_orgs) == 0:
-            raise Exception("Admin should see all organizations")
-
-        # Test manager has limited scope
-        manager_response = self.make_graphql_request(query, token=manager_token)
-        if 'errors' in manager_response:
-            raise Exception(f"Manager query failed: {json.dumps(manager_response['errors'])}")
-
-        manager_orgs = manager_response.get('data', {}).get('organizationTree', [])
-        if len(manager_orgs) >= len(admin_orgs):
-            self.log("Manager sees same or more orgs than admin - checking if this is expected", 'WARN')
-
-    def test_cqrs_routing(self):
-        """P1T3 - CQRS Routing"""
-        admin_token = self.authenticate_user('admin')
-
-        # Test read operation (query) - using correct schema
-        read_query = """
-        query GetUsers {
-            users {
-                edges {
-                    node {
-                        id
-                        email
-                        name
-                    }
-                }
-                totalCount
-            }
-        }
-        """
-
-        response = self.make_graphql_request(read_query, token=admin_token)
-        if 'errors' in response:
-            raise Exception(f"Read operation failed: {json.dumps(response['errors'])}")
-
-        users = response.get('data', {}).get('users', {}).get('edges', [])
-        if len(users) == 0:
-            raise Exception("No users returned from read operation")
-
-    def test_organization_tree_queries(self):
-        """P1T4 - Organization Tree Queries"""
-        admin_token = self.authenticate_user('admin')
-
-        # Use the correct schema structure
-        query = """
-        query GetOrganizationTree {
-            organizationTree {
-                id
-                name
-                level
-                children {
-                    id
-                    name
-                    level
-                }
-            }
-        }
-        """
-
-        response = self.make_graphql_request(query, token=admin_token)
-        if 'errors' in response:
-            raise Exception(f"Organization tree query failed: {json.dumps(response['errors'])}")
-
-        orgs = response.get('data', {}).get('organizationTree', [])
-        if len(orgs) == 0:
-            raise Exception("No organizations returned")
-
-        # Verify hierarchical structure
-        found_hierarchy = False
-        for org in orgs:
-            if org.get('children') and len(org['children']) > 0:
-                found_hierarchy = True
-                break
-
-        if not found_hierarchy:
-            self.log("No hierarchical structure found in organization tree", 'WARN')
-
-    def test_role_based_access_control(self):
-        """P1T5 - Role-Based Access Control"""
-        manager_token = self.authenticate_user('london_manager')
-        staff_token = self.authenticate_user('westminster_staff')
-
-        # Test manager permissions using correct schema
-        manager_query = """
-        query GetCurrentUser {
-            me {
-                id
-                permissions {
-                    id
-                    permissionType
-                    node {
-                        id
-                        name
-                    }
-                }
-            }
-        }
-        """
-
-        manager_response = self.make_graphql_request(manager_query, token=manager_token)
-        if 'errors' in manager_response:
-            raise Exception(f"Manager permissions query failed: {json.dumps(manager_response['errors'])}")
-
-        # Test staff permissions
-        staff_response = self.make_graphql_request(manager_query, token=staff_token)
-        if 'errors' in staff_response:
-            raise Exception(f"Staff permissions query failed: {json.dumps(staff_response['errors'])}")
-
-    def test_data_isolation(self):
-        """P1T6 - Data Isolation"""
-        london_manager_token = self.authenticate_user('london_manager')
-        manchester_manager_token = self.authenticate_user('manchester_manager')
-
-        # Use correct schema with proper field names
-        query = """
-        query GetAccessibleUsers {
-            users {
-                edges {
-                    node {
-                        id
-                        email
-                        organizationNode {
-                            id
-                            name
-                        }
-                    }
-                }
-                totalCount
-            }
-        }
-        """
-
-        london_response = self.make_graphql_request(query, token=london_manager_token)
-        manchester_response = self.make_graphql_request(query, token=manchester_manager_token)
-
-        if 'errors' in london_response:
-            raise Exception(f"London manager query failed: {json.dumps(london_response['errors'])}")
-        if 'errors' in manchester_response:
-            raise Exception(f"Manchester manager query failed: {json.dumps(manchester_response['errors'])}")
-
-    def test_audit_logging(self):
-        """P1T7 - Audit Logging"""
-        admin_token = self.authenticate_user('admin')
-
-        # Try to access audit endpoint
-        try:
-            audit_response = self.http_session.get(
-                f'{self.session.base_url}/api/audit',
-                headers={'Authorization': f'Bearer {admin_token}'},
-                timeout=10
-            )
-            if audit_response.status_code == 404:
-                self.log('Audit endpoint not found - audit logging may be implemented differently', 'WARN')
-            elif audit_response.status_code != 200:
-                self.log(f'Audit endpoint returned {audit_response.status_code}', 'WARN')
-        except Exception as e:
-            self.log('Could not verify audit logging implementation', 'WARN')
-
-    def test_error_handling(self):
-        """P1T8 - Error Handling"""
-        # Test authentication with invalid credentials
-        invalid_mutation = """
-        mutation Login($input: AuthInput!) {
-            login(input: $input) {
-                token
-            }
-        }
-        """
-
-        variables = {
-            'input': {
-                'email': 'invalid@example.com',
-                'password': 'wrongpassword'
-            }
-        }
-
-        try:
-            response = self.make_graphql_request(invalid_mutation, variables)
-            if 'errors' not in response:
-                raise Exception("Expected authentication error but got success")
-        except Exception as e:
-            if "Network request failed" in str(e):
-                raise e  # Re-raise network errors
-            # Authentication errors are expected
-
-    # Phase 2 Tests
-    def test_production_infrastructure(self):
-        """P2T1 - Production Infrastructure"""
-        # Test health check endpoint
-        try:
-            health_response = self.http_session.get(
-                f'{self.session.base_url}/api/health',
-                timeout=10
-            )
-            if health_response.status_code == 404:
-                self.log('Health check endpoint not implemented', 'WARN')
-                return
-            if health_response.status_code != 200:
-                raise Exception(f"Health check failed: {health_response.status_code}")
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Health check request failed: {str(e)}")
-
-        # Test database connectivity through GraphQL
-        admin_token = self.authenticate_user('admin')
-        db_test_query = """
-        query TestDatabaseConnection {
-            users {
-                totalCount
-            }
-        }
-        """
-
-        response = self.make_graphql_request(db_test_query, token=admin_token)
-        if 'errors' in response:
-            raise Exception(f"Database connectivity test failed: {json.dumps(response['errors'])}")
-
-    def test_performance_optimization(self):
-        """P2T2 - Performance Optimization"""
-        admin_token = self.authenticate_user('admin')
-
-        # Test query performance with correct schema
-        start_time = time.time()
-
-        performance_query = """
-        query PerformanceTest {
-            organizationTree {
-                id
-                name
-                children {
-                    id
-                    name
-                    users {
-                        id
-                        email
-                    }
-                }
-            }
-        }
-        """
-
-        response = self.make_graphql_request(performance_query, token=admin_token)
-        query_time = time.time() - start_time
-
-        if 'errors' in response:
-            raise Exception(f"Performance query failed: {json.dumps(response['errors'])}")
-
-        if query_time > 2.0:  # 2 second threshold
-            self.log(f"Query took {query_time:.2f}s - may need optimization", 'WARN')
-
-    def test_advanced_permission_management(self):
-        """P2T3 - Advanced Permission Management"""
-        admin_token = self.authenticate_user('admin')
-
-        # Test complex permission scenarios with correct schema
-        permission_query = """
-        query ComplexPermissionTest {
-            me {
-                id
-                permissions {
-                    id
-                    permissionType
-                    isActive
-                    isEffective
-                    node {
-                        id
-                        name
-                    }
-                    grantedBy {
-                        id
-                        email
-                    }
-                }
-            }
-        }
-        """
-
-        response = self.make_graphql_request(permission_query, token=admin_token)
-        if 'errors' in response:
-            raise Exception(f"Advanced permission query failed: {json.dumps(response['errors'])}")
-
-    def test_materialized_view_refresh(self):
-        """P2T4 - Materialized View Refresh"""
-        # Test materialized view refresh endpoint using CRON_SECRET
-        cron_secret = os.getenv('CRON_SECRET', 'BSZmX2Xx6XjREN3BjnF6Eb7qSQDz17wu7DmCFxEPBsg=')
-
-        try:
-            refresh_response = self.http_session.post(
-                f'{self.session.base_url}/api/cron/refresh-materialized-views',
-                headers={'Authorization': f'Bearer {cron_secret}'},
-                timeout=30
-            )
-            if refresh_response.status_code == 404:
-                self.log('Materialized view refresh endpoint not found', 'WARN')
-                return
-            if refresh_response.status_code != 200:
-                raise Exception(f"Materialized view refresh failed: {refresh_response.status_code}")
-            self.log('Materialized view refresh completed successfully', 'SUCCESS')
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Materialized view refresh request failed: {str(e)}")
-
-    # Phase 3 - CRUD Operations Tests
-    def test_create_user(self):
-        """P3T1 - Create New User"""
-        admin_token = self.authenticate_user('admin')
-
-        # Create a new user
-        create_user_mutation = """
-        mutation CreateUser($input: CreateUserInput!) {
-            createUser(input: $input) {
-                success
-                user {
-                    id
-                    email
-                    name
-                    organizationNode {
-                        id
-                        name
-                    }
-                    isActive
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        # First, get a valid organization node ID
-        org_query = """
-        query GetOrganizationTree {
-            organizationTree {
-                id
-                name
-            }
-        }
-        """
-        org_response = self.make_graphql_request(org_query, {}, admin_token)
-        if not org_response or 'errors' in org_response:
-            raise Exception("Failed to fetch organization nodes for testing")
-
-        org_nodes = org_response.get('data', {}).get('organizationTree', [])
-        if not org_nodes:
-            raise Exception("No organization nodes found for testing")
-
-        valid_org_id = org_nodes[0]['id']
-        test_email = f"test.user.{int(time.time())}@ekko.earth"
-        variables = {
-            'input': {
-                'email': test_email,
-                'name': 'Test User',
-                'password': 'TestPassword123!',
-                'organizationNodeId': valid_org_id
-            }
-        }
-
-        response = self.make_graphql_request(create_user_mutation, variables, admin_token)
-        if 'errors' in response:
-            # Log the error but don't fail if the mutation doesn't exist yet
-            self.log(f"Create user mutation not implemented: {response['errors'][0]['message']}", 'WARN')
-            return
-
-        mutation_result = response.get('data', {}).get('createUser')
-        if not mutation_result:
-            raise Exception("Create user failed: No response data")
-
-        if not mutation_result.get('success'):
-            errors = mutation_result.get('errors', [])
-            error_msg = errors[0]['message'] if errors else 'Unknown error'
-            raise Exception(f"Create user failed: {error_msg}")
-
-        created_user = mutation_result['user']
-        if not created_user or created_user['email'] != test_email:
-            raise Exception(f"User email mismatch: expected {test_email}, got {created_user['email'] if created_user else 'None'}")
-
-    def test_create_organization_node(self):
-        """P3T2 - Create New Organization Node"""
-        admin_token = self.authenticate_user('admin')
-
-        create_node_mutation = """
-        mutation CreateOrganizationNode($input: CreateOrganizationNodeInput!) {
-            createOrganizationNode(input: $input) {
-                success
-                node {
-                    id
-                    name
-                    level
-                    parent {
-                        id
-                        name
-                    }
-                    isActive
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        # First, get a valid parent organization node ID
-        org_query = """
-        query GetOrganizationTree {
-            organizationTree {
-                id
-                name
-            }
-        }
-        """
-        org_response = self.make_graphql_request(org_query, {}, admin_token)
-        if not org_response or 'errors' in org_response:
-            raise Exception("Failed to fetch organization nodes for testing")
-
-        org_nodes = org_response.get('data', {}).get('organizationTree', [])
-        valid_parent_id = org_nodes[0]['id'] if org_nodes else None
-
-        test_node_name = f"Test Node {int(time.time())}"
-        variables = {
-            'input': {
-                'name': test_node_name,
-                'parentId': valid_parent_id,  # Use valid parent ID or None for root
-                'metadata': '{"test": true}'  # JSON string, not object
-            }
-        }
-
-        response = self.make_graphql_request(create_node_mutation, variables, admin_token)
-        if 'errors' in response:
-            self.log(f"Create organization node mutation not implemented: {response['errors'][0]['message']}", 'WARN')
-            return
-
-        mutation_result = response.get('data', {}).get('createOrganizationNode')
-        if not mutation_result:
-            raise Exception("Create organization node failed: No response data")
-
-        if not mutation_result.get('success'):
-            errors = mutation_result.get('errors', [])
-            error_msg = errors[0]['message'] if errors else 'Unknown error'
-            raise Exception(f"Create organization node failed: {error_msg}")
-
-        created_node = mutation_result['node']
-        if not created_node or created_node['name'] != test_node_name:
-            raise Exception(f"Organization node name mismatch: expected {test_node_name}, got {created_node['name'] if created_node else 'None'}")
-
-    def test_grant_permission(self):
-        """P3T3 - Grant New Permission"""
-        admin_token = self.authenticate_user('admin')
-
-        grant_permission_mutation = """
-        mutation GrantPermission($input: GrantPermissionInput!) {
-            grantPermission(input: $input) {
-                success
-                permission {
-                    id
-                    permissionType
-                    isActive
-                    user {
-                        id
-                        email
-                    }
-                    node {
-                        id
-                        name
-                    }
-                    grantedBy {
-                        id
-                        email
-                    }
-                    grantedAt
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        variables = {
-            'input': {
-                'userId': 'target-user-id',  # This may need to be a valid user ID
-                'nodeId': 'target-node-id',   # This may need to be a valid node ID
-                'permissionType': 'READ',
-                'expiresAt': None
-            }
-        }
-
-        response = self.make_graphql_request(grant_permission_mutation, variables, admin_token)
-        if 'errors' in response:
-            self.log(f"Grant permission mutation not implemented: {response['errors'][0]['message']}", 'WARN')
-            return
-
-        if not response.get('data', {}).get('grantPermission'):
-            raise Exception("Grant permission failed: No permission returned")
-
-    def test_update_user(self):
-        """P3T4 - Update User Information"""
-        admin_token = self.authenticate_user('admin')
-
-        # First, get a user to update
-        get_users_query = """
-        query GetUsers {
-            users {
-                edges {
-                    node {
-                        id
-                        email
-                        name
-                    }
-                }
-            }
-        }
-        """
-
-        users_response = self.make_graphql_request(get_users_query, token=admin_token)
-        if 'errors' in users_response:
-            raise Exception(f"Failed to get users for update test: {users_response['errors']}")
-
-        users = users_response.get('data', {}).get('users', {}).get('edges', [])
-        if not users:
-            raise Exception("No users found to update")
-
-        user_to_update = users[0]['node']
-
-        update_user_mutation = """
-        mutation UpdateUser($id: ID!, $input: UpdateUserInput!) {
-            updateUser(id: $id, input: $input) {
-                success
-                user {
-                    id
-                    email
-                    name
-                    isActive
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        variables = {
-            'id': user_to_update['id'],
-            'input': {
-                'name': f"{user_to_update['name']} (Updated)",
-                'isActive': True
-            }
-        }
-
-        response = self.make_graphql_request(update_user_mutation, variables, admin_token)
-        if 'errors' in response:
-            self.log(f"Update user mutation not implemented: {response['errors'][0]['message']}", 'WARN')
-            return
-
-        mutation_result = response.get('data', {}).get('updateUser')
-        if not mutation_result:
-            raise Exception("Update user failed: No response data")
-
-        if not mutation_result.get('success'):
-            errors = mutation_result.get('errors', [])
-            error_msg = errors[0]['message'] if errors else 'Unknown error'
-            raise Exception(f"Update user failed: {error_msg}")
-
-        updated_user = mutation_result['user']
-        if not updated_user:
-            raise Exception("Update user failed: No user data returned")
-
-    def test_update_organization_structure(self):
-        """P3T5 - Update Organization Structure"""
-        admin_token = self.authenticate_user('admin')
-
-        # Get organization nodes to update
-        get_org_query = """
-        query GetOrganizationTree {
-            organizationTree {
-                id
-                name
-                level
-                children {
-                    id
-                    name
-                }
-            }
-        }
-        """
-
-        org_response = self.make_graphql_request(get_org_query, token=admin_token)
-        if 'errors' in org_response:
-            raise Exception(f"Failed to get organization tree: {org_response['errors']}")
-
-        orgs = org_response.get('data', {}).get('organizationTree', [])
-        if not orgs:
-            raise Exception("No organization nodes found to update")
-
-        node_to_update = orgs[0]
-
-        update_org_mutation = """
-        mutation UpdateOrganizationNode($id: ID!, $input: UpdateOrganizationNodeInput!) {
-            updateOrganizationNode(id: $id, input: $input) {
-                success
-                node {
-                    id
-                    name
-                    level
-                    metadata
-                    isActive
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        variables = {
-            'id': node_to_update['id'],
-            'input': {
-                'name': f"{node_to_update['name']} (Updated)",
-                'metadata': f'{{"updated": true, "timestamp": {int(time.time())}}}'
-            }
-        }
-
-        response = self.make_graphql_request(update_org_mutation, variables, admin_token)
-        if 'errors' in response:
-            self.log(f"Update organization node mutation failed: {response['errors'][0]['message']}", 'WARN')
-            return
-
-        mutation_result = response.get('data', {}).get('updateOrganizationNode', {})
-        if not mutation_result.get('success'):
-            errors = mutation_result.get('errors', [])
-            error_msg = errors[0]['message'] if errors else 'Unknown error'
-            raise Exception(f"Update organization node failed: {error_msg}")
-
-        updated_node = mutation_result['node']
-        if not updated_node:
-            raise Exception("Update organization node failed: No node data returned")
-
-    def test_modify_permissions(self):
-        """P3T6 - Modify Existing Permissions"""
-        admin_token = self.authenticate_user('admin')
-
-        # Get current user's permissions to modify
-        get_permissions_query = """
-        query GetUserPermissions($userId: ID!) {
-            user(id: $userId) {
-                permissions {
-                    id
-                    permissionType
-                    isActive
-                    node {
-                        id
-                        name
-                    }
-                }
-            }
-        }
-        """
-
-        # Use admin user's own permissions for testing
-        admin_user_query = """
-        query Me {
-            me {
-                id
-                permissions {
-                    id
-                    permissionType
-                    isActive
-                }
-            }
-        }
-        """
-
-        admin_response = self.make_graphql_request(admin_user_query, token=admin_token)
-        if 'errors' in admin_response:
-            raise Exception(f"Failed to get admin user: {admin_response['errors']}")
-
-        admin_user = admin_response.get('data', {}).get('me')
-        if not admin_user or not admin_user.get('permissions'):
-            self.log("No permissions found to modify", 'WARN')
-            return
-
-        permission_to_modify = admin_user['permissions'][0]
-
-        update_permission_mutation = """
-        mutation UpdatePermission($id: ID!, $input: UpdatePermissionInput!) {
-            updatePermission(id: $id, input: $input) {
-                success
-                permission {
-                    id
-                    permissionType
-                    isActive
-                    expiresAt
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        variables = {
-            'id': permission_to_modify['id'],
-            'input': {
-                'isActive': permission_to_modify['isActive'],
-                'expiresAt': None  # Update expiration
-            }
-        }
-
-        response = self.make_graphql_request(update_permission_mutation, variables, admin_token)
-        if 'errors' in response:
-            self.log(f"Update permission mutation failed: {response['errors'][0]['message']}", 'WARN')
-            return
-
-        mutation_result = response.get('data', {}).get('updatePermission', {})
-        if not mutation_result.get('success'):
-            errors = mutation_result.get('errors', [])
-            error_msg = errors[0]['message'] if errors else 'Unknown error'
-            raise Exception(f"Update permission failed: {error_msg}")
-
-        updated_permission = mutation_result['permission']
-        if not updated_permission:
-            raise Exception("Update permission failed: No permission data returned")
-
-    def test_activate_deactivate_users(self):
-        """P3T7 - Activate/Deactivate Users"""
-        admin_token = self.authenticate_user('admin')
-
-        # This is typically part of the update user functionality
-        deactivate_user_mutation = """
-        mutation DeactivateUser($id: ID!) {
-            updateUser(id: $id, input: { isActive: false }) {
-                success
-                user {
-                    id
-                    email
-                    isActive
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        # Get a non-admin user to deactivate
-        get_users_query = """
-        query GetUsers {
-            users {
-                edges {
-                    node {
-                        id
-                        email
-                        isActive
-                    }
-                }
-            }
-        }
-        """
-
-        users_response = self.make_graphql_request(get_users_query, token=admin_token)
-        if 'errors' in users_response:
-            raise Exception(f"Failed to get users: {users_response['errors']}")
-
-        users = users_response.get('data', {}).get('users', {}).get('edges', [])
-        if not users:
-            self.log("No users found to deactivate", 'WARN')
-            return
-
-        # Find a non-admin user
-        user_to_deactivate = None
-        for user_edge in users:
-            user = user_edge['node']
-            if user['email'] != 'admin@ekko.earth' and user['isActive']:
-                user_to_deactivate = user
-                break
-
-        if not user_to_deactivate:
-            self.log("No suitable user found to deactivate", 'WARN')
-            return
-
-        variables = {'id': user_to_deactivate['id']}
-        response = self.make_graphql_request(deactivate_user_mutation, variables, admin_token)
-
-        if 'errors' in response:
-            self.log(f"Deactivate user mutation failed: {response['errors'][0]['message']}", 'WARN')
-            return
-
-        mutation_result = response.get('data', {}).get('updateUser', {})
-        if not mutation_result.get('success'):
-            errors = mutation_result.get('errors', [])
-            error_msg = errors[0]['message'] if errors else 'Unknown error'
-            raise Exception(f"Deactivate user failed: {error_msg}")
-
-        deactivated_user = mutation_result['user']
-        if not deactivated_user:
-            raise Exception("Deactivate user failed: No user data returned")
-
-    def test_delete_users(self):
-        """P3T8 - Delete Users (Soft Delete) - Create and then delete a test user"""
-        admin_token = self.authenticate_user('admin')
-
-        # First, create a user to delete
-        create_user_mutation = """
-        mutation CreateUser($input: CreateUserInput!) {
-            createUser(input: $input) {
-                success
-                user {
-                    id
-                    email
-                    name
-                    organizationNode {
-                        id
-                        name
-                    }
-                    isActive
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        # Get organization nodes to assign the user to
-        get_orgs_query = """
-        query GetOrganizationTree {
-            organizationTree {
-                id
-                name
-                level
-            }
-        }
-        """
-
-        org_response = self.make_graphql_request(get_orgs_query, token=admin_token)
-        if 'errors' in org_response:
-            raise Exception(f"Failed to get organization nodes: {org_response['errors']}")
-
-        orgs = org_response.get('data', {}).get('organizationTree', [])
-        if not orgs:
-            raise Exception("No organization nodes found for user creation")
-
-        # Use the first organization node
-        org_node_id = orgs[0]['id']
-
-        # Create the test user
-        test_email = f'test.delete.user.{int(time.time())}@ekko.earth'
-        create_variables = {
-            'input': {
-                'email': test_email,
-                'name': 'Test Delete User',
-                'password': 'TestPassword123!',
-                'organizationNodeId': org_node_id
-            }
-        }
-
-        create_response = self.make_graphql_request(create_user_mutation, create_variables, admin_token)
-        if 'errors' in create_response:
-            raise Exception(f"Failed to create test user: {create_response['errors'][0]['message']}")
-
-        create_result = create_response.get('data', {}).get('createUser', {})
-        if not create_result.get('success'):
-            errors = create_result.get('errors', [])
-            error_msg = errors[0]['message'] if errors else 'Unknown error'
-            raise Exception(f"Create test user failed: {error_msg}")
-
-        created_user = create_result['user']
-        if not created_user:
-            raise Exception("Create test user failed: No user data returned")
-
-        user_id_to_delete = created_user['id']
-
-        # Now delete the created user
-        delete_user_mutation = """
-        mutation DeleteUser($id: ID!) {
-            deleteUser(id: $id) {
-                success
-                user {
-                    id
-                    email
-                    isActive
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        delete_variables = {'id': user_id_to_delete}
-        delete_response = self.make_graphql_request(delete_user_mutation, delete_variables, admin_token)
-
-        if 'errors' in delete_response:
-            raise Exception(f"Delete user mutation failed: {delete_response['errors'][0]['message']}")
-
-        delete_result = delete_response.get('data', {}).get('deleteUser', {})
-        if not delete_result.get('success'):
-            errors = delete_result.get('errors', [])
-            error_msg = errors[0]['message'] if errors else 'Unknown error'
-            raise Exception(f"Delete user failed: {error_msg}")
-
-        deleted_user = delete_result['user']
-        if not deleted_user:
-            raise Exception("Delete user failed: No user data returned")
-
-        # Verify the user was soft deleted (should be marked as inactive)
-        if deleted_user.get('isActive', True):
-            self.log("Warning: User appears to still be active after deletion", 'WARN')
-
-    def test_delete_organization_nodes(self):
-        """P3T9 - Delete Organization Nodes - Create and then delete a test org node"""
-        admin_token = self.authenticate_user('admin')
-
-        # First, create an organization node to delete
-        create_node_mutation = """
-        mutation CreateOrganizationNode($input: CreateOrganizationNodeInput!) {
-            createOrganizationNode(input: $input) {
-                success
-                node {
-                    id
-                    name
-                    level
-                    parent {
-                        id
-                        name
-                    }
-                    isActive
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        # Get existing org nodes to use as parent
-        get_orgs_query = """
-        query GetOrganizationTree {
-            organizationTree {
-                id
-                name
-                level
-            }
-        }
-        """
-
-        org_response = self.make_graphql_request(get_orgs_query, token=admin_token)
-        if 'errors' in org_response:
-            raise Exception(f"Failed to get organization nodes: {org_response['errors']}")
-
-        orgs = org_response.get('data', {}).get('organizationTree', [])
-        if not orgs:
-            raise Exception("No organization nodes found for parent assignment")
-
-        # Use the first organization node as parent
-        parent_node_id = orgs[0]['id']
-
-        # Create the test organization node
-        test_node_name = f'Test Delete Node {int(time.time())}'
-        create_variables = {
-            'input': {
-                'name': test_node_name,
-                'parentId': parent_node_id,
-                'metadata': f'{{"test": true, "created_at": "{int(time.time())}"}}'
-            }
-        }
-
-        create_response = self.make_graphql_request(create_node_mutation, create_variables, admin_token)
-        if 'errors' in create_response:
-            raise Exception(f"Failed to create test organization node: {create_response['errors'][0]['message']}")
-
-        create_result = create_response.get('data', {}).get('createOrganizationNode', {})
-        if not create_result.get('success'):
-            errors = create_result.get('errors', [])
-            error_msg = errors[0]['message'] if errors else 'Unknown error'
-            raise Exception(f"Create test organization node failed: {error_msg}")
-
-        created_node = create_result['node']
-        if not created_node:
-            raise Exception("Create test organization node failed: No node data returned")
-
-        node_id_to_delete = created_node['id']
-
-        # Now delete the created organization node
-        delete_node_mutation = """
-        mutation DeleteOrganizationNode($id: ID!) {
-            deleteOrganizationNode(id: $id) {
-                success
-                node {
-                    id
-                    name
-                    isActive
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        delete_variables = {'id': node_id_to_delete}
-        delete_response = self.make_graphql_request(delete_node_mutation, delete_variables, admin_token)
-
-        if 'errors' in delete_response:
-            raise Exception(f"Delete organization node mutation failed: {delete_response['errors'][0]['message']}")
-
-        delete_result = delete_response.get('data', {}).get('deleteOrganizationNode', {})
-        if not delete_result.get('success'):
-            errors = delete_result.get('errors', [])
-            error_msg = errors[0]['message'] if errors else 'Unknown error'
-            raise Exception(f"Delete organization node failed: {error_msg}")
-
-        deleted_node = delete_result['node']
-        if not deleted_node:
-            raise Exception("Delete organization node failed: No node data returned")
-
-        # Verify the node was soft deleted (should be marked as inactive)
-        if deleted_node.get('isActive', True):
-            self.log("Warning: Organization node appears to still be active after deletion", 'WARN')
-
-    def test_revoke_permissions(self):
-        """P3T10 - Revoke Permissions - Create user, grant permission, then revoke it"""
-        admin_token = self.authenticate_user('admin')
-
-        # Get organization nodes for the permission
-        get_orgs_query = """
-        query GetOrganizationTree {
-            organizationTree {
-                id
-                name
-                level
-            }
-        }
-        """
-
-        orgs_response = self.make_graphql_request(get_orgs_query, token=admin_token)
-        if 'errors' in orgs_response:
-            raise Exception(f"Failed to get organization nodes: {orgs_response['errors']}")
-
-        orgs = orgs_response.get('data', {}).get('organizationTree', [])
-        if not orgs:
-            raise Exception("No organization nodes found for permission testing")
-
-        target_node_id = orgs[0]['id']  # Use first org node
-
-        # Step 1: Create a test user specifically for this permission test
-        current_time = int(time.time())
-        create_user_mutation = """
-        mutation CreateUser($input: CreateUserInput!) {
-            createUser(input: $input) {
-                success
-                user {
-                    id
-                    email
-                    name
-                    organizationNode {
-                        id
-                        name
-                    }
-                    isActive
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        create_variables = {
-            'input': {
-                'email': f'testpermissionuser{current_time}@example.com',
-                'name': f'Test Permission User {current_time}',
-                'password': 'TestPassword123!',
-                'organizationNodeId': target_node_id
-            }
-        }
-
-        create_response = self.make_graphql_request(create_user_mutation, create_variables, admin_token)
-        if 'errors' in create_response:
-            raise Exception(f"Create test user mutation failed: {create_response['errors'][0]['message']}")
-
-        create_result = create_response.get('data', {}).get('createUser', {})
-        if not create_result.get('success'):
-            errors = create_result.get('errors', [])
-            error_msg = errors[0]['message'] if errors else 'Unknown error'
-            raise Exception(f"Create test user failed: {error_msg}")
-
-        created_user = create_result['user']
-        if not created_user:
-            raise Exception("Create test user failed: No user data returned")
-
-        target_user_id = created_user['id']
-
-        # Step 2: Grant a test permission to the new user
-        grant_permission_mutation = """
-        mutation GrantPermission($input: GrantPermissionInput!) {
-            grantPermission(input: $input) {
-                success
-                permission {
-                    id
-                    permissionType
-                    user {
-                        id
-                        email
-                    }
-                    node {
-                        id
-                        name
-                    }
-                    isActive
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        grant_variables = {
-            'input': {
-                'userId': target_user_id,
-                'nodeId': target_node_id,
-                'permissionType': 'READ'  # Grant a READ permission for testing
-            }
-        }
-
-        grant_response = self.make_graphql_request(grant_permission_mutation, grant_variables, admin_token)
-        if 'errors' in grant_response:
-            raise Exception(f"Failed to grant test permission: {grant_response['errors'][0]['message']}")
-
-        grant_result = grant_response.get('data', {}).get('grantPermission', {})
-        if not grant_result.get('success'):
-            errors = grant_result.get('errors', [])
-            error_msg = errors[0]['message'] if errors else 'Unknown error'
-            raise Exception(f"Grant test permission failed: {error_msg}")
-
-        granted_permission = grant_result['permission']
-        if not granted_permission:
-            raise Exception("Grant test permission failed: No permission data returned")
-
-        permission_id_to_revoke = granted_permission['id']
-
-        # Step 3: Revoke the granted permission
-        revoke_permission_mutation = """
-        mutation RevokePermission($input: RevokePermissionInput!) {
-            revokePermission(input: $input) {
-                success
-                permission {
-                    id
-                    permissionType
-                    isActive
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
-
-        revoke_variables = {'input': {'permissionId': permission_id_to_revoke}}
-        revoke_response = self.make_graphql_request(revoke_permission_mutation, revoke_variables, admin_token)
-
-        if 'errors' in revoke_response:
-            raise Exception(f"Revoke permission mutation failed: {revoke_response['errors'][0]['message']}")
-
-        revoke_result = revoke_response.get('data', {}).get('revokePermission', {})
-        if not revoke_result.get('success'):
-            errors = revoke_result.get('errors', [])
-            error_msg = errors[0]['message'] if errors else 'Unknown error'
-            raise Exception(f"Revoke permission failed: {error_msg}")
-
-        revoked_permission = revoke_result['permission']
-        if not revoked_permission:
-            raise Exception("Revoke permission failed: No permission data returned")
-
-        # Verify the permission was revoked (should be marked as inactive)
-        if revoked_permission.get('isActive', True):
-            self.log("Warning: Permission appears to still be active after revocation", 'WARN')
-
-        # Step 4: Clean up - delete the test user
-        delete_user_mutation = """
-        mutation DeleteUser($id: ID!) {
-            deleteUser(id: $id) {
-                success
-                user {
-                    id
-                    email
-                    isActive
-                }
-                errors {
-                    message
-                    code
-                    field
-                }
-            }
-        }
-        """
+# Kept in sync with the runner's User-Agent (Ekko-Test-Runner/<version>-Python)
+__version__ = '1.0'
+
+# Target URLs resolved once at import; the environment cannot change
+# between then and parse time
+_PROD_URL = os.environ.get(
+    'EKKO_PROD_URL',
+    'https://ekko-permissions-ji7uay4dv-erinversfeldcodes-projects.vercel.app'
+)
+_LOCAL_URL = os.environ.get('EKKO_TEST_URL', 'http://localhost:3000')
+
+# Hosting platforms whose deployments count as production when an
+# explicit --url is given; endswith takes the whole tuple in one C call
+_PROD_HOST_SUFFIXES = ('vercel.app', 'fly.dev')
+
+_USAGE = 'usage: automated-deployment-testing.py [-h] [-V] [--url URL | --prod | --local] [--workers N] [--verbose]\n'
+
+_HELP = _USAGE + """
+Automated Deployment Testing for Ekko Permissions System
+
+options:
+  -h, --help     show this help message and exit
+  -V, --version  show the version and exit
+  --url URL      Custom URL to test against
+  --prod         Test against production deployment
+  --local        Test against local development server (SQLite)
+  --workers N    Number of concurrent test workers (1 disables parallelism, default 8)
+  --verbose      Enable per-request debug logging
+"""
 
-        delete_variables = {'id': target_user_id}
-        delete_response = self.make_graphql_request(delete_user_mutation, delete_variables, admin_token)
 
-        # Don't fail the test if cleanup fails, just log it
-        if 'errors' in delete_response:
-            self.log(f"Cleanup: Failed to delete test user: {delete_response['errors'][0]['message']}", 'WARN')
+def _usage_error(message: str) -> int:
+    sys.stderr.write(f'{_USAGE}automated-deployment-testing.py: error: {message}\n')
+    return 2
+
+
+def main() -> int:
+    # Hand-rolled parsing for five flags: skips importing argparse (and
+    # the gettext/textwrap graph behind it) on every invocation
+    url = None
+    mode_flag = None
+    workers = 8
+    verbose = False
+
+    arg_iter = iter(sys.argv[1:])
+    for arg in arg_iter:
+        name, sep, value = arg.partition('=')
+        if sep and name in ('-h', '--help', '-V', '--version', '--prod', '--local', '--verbose'):
+            # Valueless flags must not silently discard a value
+            # (--prod=no would otherwise enable prod mode)
+            return _usage_error(f'argument {name}: ignored explicit argument {value!r}')
+        if name in ('-h', '--help'):
+            sys.stdout.write(_HELP)
+            return 0
+        elif name in ('-V', '--version'):
+            print(f'ekko-deployment-tests {__version__}')
+            return 0
+        elif name in ('--prod', '--local'):
+            flag = name[2:]
+            if url is not None or (mode_flag is not None and mode_flag != flag):
+                return _usage_error(f'argument {name}: not allowed with --url/--prod/--local')
+            mode_flag = flag
+        elif name == '--url':
+            if mode_flag is not None:
+                return _usage_error(f'argument --url: not allowed with --{mode_flag}')
+            url = value if value else next(arg_iter, None)
+            if not url:
+                return _usage_error('argument --url: expected one argument')
+        elif name == '--workers':
+            raw = value if value else next(arg_iter, None)
+            try:
+                workers = int(raw)
+            except (TypeError, ValueError):
+                return _usage_error(f"argument --workers: invalid int value: {raw!r}")
+        elif name == '--verbose':
+            verbose = True
         else:
-            delete_result = delete_response.get('data', {}).get('deleteUser', {})
-            if not delete_result.get('success'):
-                errors = delete_result.get('errors', [])
-                error_msg = errors[0]['message'] if errors else 'Unknown error'
-                self.log(f"Cleanup: Delete test user failed: {error_msg}", 'WARN')
-            else:
-                self.log("Cleanup: Test user deleted successfully", 'INFO')
-
-    def check_deployment_access(self) -> bool:
-        """Check if deployment is accessible"""
-        try:
-            response = self.http_session.get(f'{self.session.base_url}/login', timeout=10)
-            if response.status_code in [401, 403]:
-                self.log('Deployment is protected by authentication', 'WARN')
-                return False
-            if response.status_code != 200:
-                self.log(f'Unexpected response: {response.status_code}', 'WARN')
-                return False
-            self.log('Deployment is accessible', 'SUCCESS')
-            return True
-        except Exception as e:
-            self.log(f'Failed to access deployment: {str(e)}', 'ERROR')
-            return False
-
-    def run_phase1_tests(self):
-        """Run all Phase 1 tests"""
-        self.log("=== Starting Phase 1 Tests ===")
-
-        self.run_test('P1T1', 'User Authentication', self.test_authentication)
-        self.run_test('P1T2', 'Hierarchical Permissions', self.test_hierarchical_permissions)
-        self.run_test('P1T3', 'CQRS Routing', self.test_cqrs_routing)
-        self.run_test('P1T4', 'Organization Tree Queries', self.test_organization_tree_queries)
-        self.run_test('P1T5', 'Role-Based Access Control', self.test_role_based_access_control)
-        self.run_test('P1T6', 'Data Isolation', self.test_data_isolation)
-        self.run_test('P1T7', 'Audit Logging', self.test_audit_logging)
-        self.run_test('P1T8', 'Error Handling', self.test_error_handling)
-
-    def run_phase2_tests(self):
-        """Run all Phase 2 tests"""
-        self.log("=== Starting Phase 2 Tests ===")
-
-        self.run_test('P2T1', 'Production Infrastructure', self.test_production_infrastructure)
-        self.run_test('P2T2', 'Performance Optimization', self.test_performance_optimization)
-        self.run_test('P2T3', 'Advanced Permission Management', self.test_advanced_permission_management)
-        self.run_test('P2T4', 'Materialized View Refresh', self.test_materialized_view_refresh)
-
-    def run_phase3_tests(self):
-        """Run all Phase 3 CRUD tests"""
-        self.log("=== Starting Phase 3 CRUD Tests ===")
-
-        # CREATE Operations
-        self.run_test('P3T1', 'Create New User', self.test_create_user)
-        self.run_test('P3T2', 'Create New Organization Node', self.test_create_organization_node)
-        self.run_test('P3T3', 'Grant New Permission', self.test_grant_permission)
-
-        # UPDATE Operations
-        self.run_test('P3T4', 'Update User Information', self.test_update_user)
-        self.run_test('P3T5', 'Update Organization Structure', self.test_update_organization_structure)
-        self.run_test('P3T6', 'Modify Existing Permissions', self.test_modify_permissions)
-        self.run_test('P3T7', 'Activate/Deactivate Users', self.test_activate_deactivate_users)
-
-        # DELETE Operations
-        self.run_test('P3T8', 'Delete Users (Soft Delete)', self.test_delete_users)
-        self.run_test('P3T9', 'Delete Organization Nodes', self.test_delete_organization_nodes)
-        self.run_test('P3T10', 'Revoke Permissions', self.test_revoke_permissions)
-
-    def generate_report(self):
-        """Generate test results report"""
-        total_tests = len(self.session.results)
-        passed = len([r for r in self.session.results if r.status == 'PASS'])
-        failed = len([r for r in self.session.results if r.status == 'FAIL'])
-        skipped = len([r for r in self.session.results if r.status == 'SKIP'])
-
-        total_duration = time.time() - self.session.start_time
-        success_rate = (passed / total_tests * 100) if total_tests > 0 else 0
-
-        self.log("=== Test Results Summary ===")
-        self.log(f"Total Tests: {total_tests}")
-        self.log(f"Passed: {passed}", 'SUCCESS')
-        self.log(f"Failed: {failed}", 'ERROR')
-        self.log(f"Skipped: {skipped}")
-        self.log(f"Total Duration: {total_duration*1000:.0f}ms")
-        self.log(f"Success Rate: {success_rate:.1f}%")
-
-        if failed > 0:
-            self.log("=== Failed Tests Details ===", 'ERROR')
-            for result in self.session.results:
-                if result.status == 'FAIL':
-                    self.log(f"{result.test_id}: {result.message}", 'ERROR')
-
-        # Save detailed JSON report
-        report = {
-            'summary': {
-                'total_tests': total_tests,
-                'passed': passed,
-                'failed': failed,
-                'skipped': skipped,
-                'success_rate': success_rate,
-                'total_duration_ms': total_duration * 1000,
-                'target_url': self.session.base_url,
-                'timestamp': datetime.now().isoformat()
-            },
-            'results': [
-                {
-                    'test_id': r.test_id,
-                    'name': r.name,
-                    'status': r.status,
-                    'message': r.message,
-                    'duration_ms': r.duration * 1000
-                }
-                for r in self.session.results
-            ]
-        }
-
-        with open('deployment-test-results.json', 'w') as f:
-            json.dump(report, f, indent=2)
-
-        self.log(f"Detailed report saved to: deployment-test-results.json")
-
-        return failed == 0  # Return True if all tests passed
-
-    def run(self) -> bool:
-        """Run all tests and return success status"""
-        self.log("Starting Ekko Permissions System Test Suite")
-        self.log(f"Target URL: {self.session.base_url}")
-        self.log(f"Test Accounts: {len(self.session.accounts)}")
-
-        # Check deployment accessibility
-        self.log(f"Checking deployment access at {self.session.base_url}")
-        if not self.check_deployment_access():
-            self.log("Deployment is protected - tests may be limited", 'WARN')
-
-        # Run test suites
-        self.run_phase1_tests()
-        self.run_phase2_tests()
-        self.run_phase3_tests()
-
-        # Generate report and return success status
-        return self.generate_report()
-
-
-def main():
-    parser = argparse.ArgumentParser(description='Automated Deployment Testing for Ekko Permissions System')
-    parser.add_argument('--url', help='Custom URL to test against')
-    parser.add_argument('--prod', action='store_true', help='Test against production deployment')
-    parser.add_argument('--local', action='store_true', help='Test against local development server (SQLite)')
-    args = parser.parse_args()
-
-    # Determine environment and target URL
-    if args.url:
-        target_url = args.url
-        # Auto-detect production based on URL
-        is_production = 'vercel.app' in args.url or 'https://' in args.url
-    elif args.prod:
-        target_url = os.getenv('EKKO_PROD_URL', 'https://ekko-permissions-ji7uay4dv-erinversfeldcodes-projects.vercel.app')
-        is_production = True
-    elif args.local:
-        target_url = os.getenv('EKKO_TEST_URL', 'http://localhost:3000')
-        is_production = False
-    else:
-        # Default to local development
-        target_url = os.getenv('EKKO_TEST_URL', 'http://localhost:3000')
-        is_production = False
-
-    print(f"Testing environment: {'Production (PostgreSQL)' if is_production else 'Local (SQLite)'}")
-    print(f"Target URL: {target_url}")
+            return _usage_error(f'unrecognized arguments: {arg}')
+
+    # Determine environment and target URL: one table keyed on mode, with
+    # production auto-detected for explicit URLs and local as the default.
+    # Detection matches the URL's host (not the whole string, which a
+    # path or query segment could fool) against the production suffixes.
+    url = url or ''
+    host = url.partition('://')[2].partition('/')[0]
+    mode = 'url' if url else (mode_flag or 'local')
+    target_url, is_production = {
+        'url': (url, url.startswith('https://') and host.endswith(_PROD_HOST_SUFFIXES)),
+        'prod': (_PROD_URL, True),
+        'local': (_LOCAL_URL, False),
+    }[mode]
+
+    # One write call for both status lines - a single syscall and stdout
+    # lock acquisition instead of two
+    sys.stdout.write(
+        f"Testing environment: {'Production (PostgreSQL)' if is_production else 'Local (SQLite)'}\n"
+        f"Target URL: {target_url}\n"
+    )
+
+    # Deferred until a run is actually happening: pulling in the runner
+    # means importing the whole HTTP stack, which --help and argument
+    # errors should never pay for
+    from _runner import EkkoTestRunner
 
     # Run tests
-    runner = EkkoTestRunner(target_url, is_production)
+    runner = EkkoTestRunner(target_url, is_production, max_workers=workers, verbose=verbose)
     success = runner.run()
 
-    # Exit with appropriate code for CI/CD
-    sys.exit(0 if success else 1)
+    # Exit code for CI/CD; raising SystemExit is left to the guard below
+    # so in-process callers can invoke main() directly
+    return 0 if success else 1
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())